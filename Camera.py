@@ -1,18 +1,28 @@
+import asyncio
+import functools
+import logging
 import sys
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
 
 import cv2
 import numpy as np
 from cv2_enumerate_cameras import enumerate_cameras
 from cv2_enumerate_cameras.camera_info import CameraInfo
 
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def _enumerate_cameras_cached(backend: int) -> list[CameraInfo]:
+    return enumerate_cameras(backend)
+
 
 class Camera:
-    def __init__(self, index: Optional[int] = None):
+    def __init__(self, index: Optional[Union[int, str]] = None):
         self.cam: Optional[cv2.VideoCapture] = None
 
         if index is not None:
-            self.cam  = cv2.VideoCapture(index)
+            self.open(index)
 
     def __del__(self):
         self.close()
@@ -24,17 +34,55 @@ class Camera:
         self.close()
 
 
-    def open(self, index: int) -> bool:
+    def open(self, index: Union[int, str], buffer_size: int = 1) -> bool:
+        """
+        打开摄像头，并把驱动缓冲压到 buffer_size 帧，避免 read() 拿到旧帧
+
+        :param index: 摄像头序号，或 rtsp:// / http(s):// 流地址（走 GStreamer）
+        :param buffer_size: 驱动端缓冲帧数；1 失败时自动退回 2
+        """
         self.close()
 
-        self.cam = cv2.VideoCapture(index)
+        is_url = isinstance(index, str) and index.startswith(("rtsp://", "http://", "https://"))
+        if is_url:
+            self.cam = cv2.VideoCapture(self.gstreamer_pipeline(index), cv2.CAP_GSTREAMER)
+        else:
+            self.cam = cv2.VideoCapture(index)
         if not self.cam.isOpened():
             self.cam.release()
             self.cam = None
             return False
 
+        # 管道里的 leaky queue 已经把缓冲限制在 1 帧
+        if is_url:
+            return True
+
+        # Windows MSMF 默认走 YUY2，MJPEG 解码快得多
+        if sys.platform.startswith("win"):
+            ok = self.cam.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            logger.info(f"CAP_PROP_FOURCC=MJPG: {ok}")
+
+        ok = self.cam.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        if not ok and buffer_size == 1:
+            buffer_size = 2
+            ok = self.cam.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        logger.info(f"CAP_PROP_BUFFERSIZE={buffer_size}: {ok}")
+
         return True
 
+    @staticmethod
+    def gstreamer_pipeline(url: str) -> str:
+        """
+        网络流的 GStreamer 管道：leaky queue + appsink drop，只保留最新 1 帧，
+        避免 FFmpeg 后端内部缓冲造成的秒级延迟
+        """
+        if url.startswith("rtsp://"):
+            source = f"rtspsrc location={url} latency=0 ! rtph264depay ! h264parse ! avdec_h264"
+        else:
+            source = f"uridecodebin uri={url}"
+        return (f"{source} ! videoconvert ! video/x-raw,format=BGR"
+                f" ! queue max-size-buffers=1 leaky=downstream ! appsink drop=1 sync=false")
+
     def close(self):
         if self.cam is not None:
             self.cam.release()
@@ -51,9 +99,26 @@ class Camera:
             raise RuntimeError("Failed to read frame")
         return frame
 
+    def grab(self) -> bool:
+        """只推进到下一帧，不解码"""
+        if not self.is_opened():
+            raise RuntimeError("Camera is not opened")
+        return self.cam.grab()
+
+    def retrieve(self, image: Optional[np.ndarray] = None) -> Tuple[bool, np.ndarray]:
+        """
+        解码最近一次 grab() 拿到的帧
+
+        :param image: 预分配的输出缓冲，尺寸匹配时直接写进去
+        """
+        if not self.is_opened():
+            raise RuntimeError("Camera is not opened")
+        return self.cam.retrieve(image)
+
     @staticmethod
-    def devices(backend: Optional[int] = None) -> list[CameraInfo]:
+    def devices(backend: Optional[int] = None, refresh: bool = False) -> list[CameraInfo]:
         """
+        枚举摄像头，结果按 backend 缓存，热插拔后用 refresh=True 重新枚举
 
         :rtype: list[CameraInfo]
         """
@@ -66,5 +131,16 @@ class Camera:
                 backend = cv2.CAP_AVFOUNDATION
             else:
                 backend = cv2.CAP_ANY
-        return enumerate_cameras(backend)
+        if refresh:
+            _enumerate_cameras_cached.cache_clear()
+        return _enumerate_cameras_cached(backend)
+
+    @staticmethod
+    async def devices_async(backend: Optional[int] = None, refresh: bool = False) -> list[CameraInfo]:
+        """
+        在线程池里枚举，MSMF/V4L2 遍历设备可能要几百毫秒，别卡住 GUI 线程
+
+        :rtype: list[CameraInfo]
+        """
+        return await asyncio.to_thread(Camera.devices, backend, refresh)
 
@@ -0,0 +1,26 @@
+# LatestSlot.py
+from typing import Any
+
+
+class LatestSlot:
+    """
+    单槽「只保留最新」容器，一个生产者 + 一个消费者
+
+    GIL 下单个属性的读写是原子的，所以不需要锁；
+    put 会直接覆盖还没被取走的旧值。
+    """
+    __slots__ = ('v',)
+
+    def __init__(self):
+        self.v: Any = None
+
+    def put(self, x: Any):
+        self.v = x
+
+    def get(self) -> Any:
+        v = self.v
+        self.v = None
+        return v
+
+    def empty(self) -> bool:
+        return self.v is None
@@ -1,14 +1,14 @@
 import asyncio
-import json
 import logging
 import sys
 import threading
 import time
-from queue import Queue, Full, Empty
+from concurrent.futures import Future, ThreadPoolExecutor
 from threading import Event
 from typing import Any
 
 import cv2
+import numpy as np
 import qasync
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QCloseEvent
@@ -16,24 +16,30 @@ from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
     QSplitter, QStatusBar, QLabel, QPushButton, QComboBox, QMessageBox
 )
+from cv2_enumerate_cameras.camera_info import CameraInfo
 from numpy import ndarray
 from qt_material import apply_stylesheet
 
 from Camera import Camera
+from LatestSlot import LatestSlot
 from RTCSender import RTCSender
 from RenderWidget import RenderWidget, PixelFormat
+from ThreadAffinity import pin_current_thread, unpin_current_thread
+from WarningThrottle import WarningThrottle
 
-logger = logging.getLogger(__file__)
+logger = logging.getLogger(__name__)
 
 
 class MainWindow(QMainWindow):
-    signalFrame: Signal = Signal(object)  # frame: ndarray
+    signalFrame: Signal = Signal(int)  # 幀序號，幀本身在前台緩衝
     STATUS_STOPPED = "Detection: Stopped"
     STATUS_STARTING = "Detection: Starting..."
     STATUS_CONNECTING = "Detection: Connecting (ICE checking)..."
     STATUS_CONNECTED = "Detection: Connected ✓"
     STATUS_FAILED = "Detection: Failed ×"
     STATUS_CLOSED = "Detection: Closed"
+    RTC_MAX_SIZE = (640, 360)  # 送去檢測的幀最大尺寸，aiortc 反正要重新編碼
+    CAPTURE_CORE = 2  # 采集線程寫後台緩衝，和主線程（main.py 綁的 UI_CORE）分開核，緩衝留在各自的快取裡
 
     def __init__(self):
         super().__init__()
@@ -44,15 +50,38 @@ class MainWindow(QMainWindow):
         self.camListBtn: QPushButton | None = None
         self.mStatusText: QLabel | None = None
 
-        self.readFrameThread: threading.Thread | None = None
-        self.readFrameThreadIsRunning: Event = threading.Event()  # set true; clear false
-        self.readFrameThreadIsRunning.clear()
+        # 采集跑在 qasync 事件循环上，阻塞的 grab/retrieve 丢给单线程池
+        self.captureTask: asyncio.Future | None = None
+        self.capturePool: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="capture",
+            initializer=self.initCaptureThread, initargs=(self.CAPTURE_CORE,))
+        # 双缓冲：线程池写 frameBuffers[frameWriteIndex]，主线程读另一块；交换只在主线程做
+        self.frameBuffers: list[ndarray | None] = [None, None]
+        self.frameWriteIndex: int = 0
+        self.frameGeneration: int = 0  # 前台缓冲里的幀序號
+        self.displayedGeneration: int = 0  # 主线程已经显示到的幀序號
+        # 在采集线程里就缩到显示/rtc 需要的尺寸
+        self.rawFrame: ndarray | None = None  # 需要缩放时，原始帧解码到这里
+        self.rawFrameSize: tuple[int, int] | None = None  # 摄像头原始 (w, h)
+        self.displayTargetSize: tuple[int, int] | None = None  # camWidget 的设备像素 (w, h)
+        self.displaySize: tuple[int, int] | None = None  # 缩放后的显示 (w, h)，尺寸变了才重算
+        self.rtcFrameSize: tuple[int, int] | None = None  # 送去 rtc 的 (w, h)，检测框坐标以它为准
+        self.backFrameSize: tuple[int, int] | None = None  # 采集线程刚写进后台缓冲的 (w, h)
+        # 前台缓冲的尺寸，打开摄像头/缩放窗口时才变，每帧直接用
+        self.frameSize: tuple[int, int] | None = None
+        self.frameWidth: int = 0
+        self.frameHeight: int = 0
 
         self.camera: Camera | None = Camera()
         self.rtcSender: RTCSender = RTCSender()
         self.rtcSenderIsRunning: Event = threading.Event()  # set true; clear false
-        self.camToRtcQueue: Queue = Queue(1)
-        self.rtcToCamQueue: Queue = Queue(1)
+        self.rtcToCamSlot: LatestSlot = LatestSlot()
+
+        # class_name → 是否 cavity；詞彙表很小，第一次見到時算一次就記下來
+        self.classIsCavity: dict[str, bool] = {}
+
+        # 每幀路徑上的警告限流，壞包風暴時不刷屏
+        self.warningThrottle: WarningThrottle = WarningThrottle(logger)
 
         self.initUI()
         self.setGeometry((QApplication.primaryScreen().availableGeometry().width() - 1000) // 2,
@@ -63,8 +92,8 @@ class MainWindow(QMainWindow):
         self.updateCameraList()
 
     def closeEvent(self, event: QCloseEvent):
-        self.stopReadFrameThreadFunction()
-        self.camera.close()
+        self.stopCaptureTask()
+        self.capturePool.shutdown(wait=False)
         super().closeEvent(event)
 
     def initUI(self):
@@ -128,14 +157,29 @@ class MainWindow(QMainWindow):
 
     def initSignalSlots(self):
         if self.camListBtn:
-            self.camListBtn.clicked.connect(self.updateCameraList)
+            self.camListBtn.clicked.connect(lambda: self.updateCameraList(refresh=True))
         if self.camListComBoBox:
             self.camListComBoBox.currentIndexChanged.connect(self.cameraListCurrentChanged)
         self.signalFrame.connect(self.onFrameArrived)
+        if self.camWidget:
+            self.camWidget.signalResized.connect(self.onRenderWidgetResized)
         if self.openOrCloseDetBtn:
             self.openOrCloseDetBtn.clicked.connect(self.openOrCloseDetection)
 
-    def updateCameraList(self):
+    def updateCameraList(self, refresh: bool = False):
+        """
+        后台枚举摄像头，完成后在 onCameraListReady 里填充下拉框
+        """
+        future = asyncio.ensure_future(Camera.devices_async(refresh=refresh))
+        future.add_done_callback(self.onCameraListReady)
+
+    def onCameraListReady(self, future: asyncio.Future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error("枚举摄像头失败", exc_info=future.exception())
+            return
+        devices: list[CameraInfo] = future.result()
 
         # 阻止刷新期间触发索引改变信号
         self.camListComBoBox.blockSignals(True)
@@ -145,14 +189,14 @@ class MainWindow(QMainWindow):
         self.camListComBoBox.clear()
         if (itemName is None or itemNum is None) or itemName == self.tr("close"):
             self.camListComBoBox.addItem(self.tr("close"), -1)
-            for dev in Camera.devices():
+            for dev in devices:
                 name: str = dev.name
                 displayName: str = name if name is not None else f"Camera {dev.index}"
                 self.camListComBoBox.addItem(displayName, dev.index)
         else:
             self.camListComBoBox.addItem(itemName, itemNum)
             self.camListComBoBox.addItem(self.tr("close"), -1)
-            for dev in Camera.devices():
+            for dev in devices:
                 name: str = dev.name
                 displayName: str = name if name is not None else f"Camera {dev.index}"
                 if displayName != itemName:
@@ -167,159 +211,258 @@ class MainWindow(QMainWindow):
         if index == -1:
             return
 
+        # === 1. 先安全停止旧的采集任务，close 排在最后一次 grab 之后 ===
+        closed = self.stopCaptureTask()
+
         # === close 分支 ===
         if self.camListComBoBox.itemText(index) == self.tr("close"):
-            if self.readFrameThreadIsRunning.is_set():
-                self.stopReadFrameThreadFunction()
-            self.camera.close()
-            print("摄像头关闭成功！")
+            closed.add_done_callback(lambda _: logger.info("摄像头关闭成功！"))
             self.camWidget.clear()
             return
 
-        # === 1. 先安全停止旧线程 ===
-        if self.readFrameThreadIsRunning.is_set():
-            self.stopReadFrameThreadFunction()
+        # === 2. 等旧摄像头真正关掉，再打开并启动新的采集任务 ===
+        self.captureTask = asyncio.ensure_future(self.openCamera(cam_id, closed))
 
-        # === 2. 打开摄像头并启动新线程 ===
-        if self.camera.open(cam_id):
-            print("摄像头打开成功！")
+    async def openCamera(self, cam_id: int, closed: Future):
+        """
+        等 capturePool 里的 close 执行完再打开摄像头，之后进入采集循环；中途被取消就不打开
+        """
+        await asyncio.wrap_future(closed)
+        if not self.camera.open(cam_id):
+            return
+        logger.info("摄像头打开成功！")
 
-            self.readFrameThreadIsRunning.set()
+        self.prepareFramePath()
+        await self.captureLoop()
 
-            self.readFrameThread = threading.Thread(
-                target=self.readFrameThreadFunction,
-                daemon=True
-            )
-            self.readFrameThread.start()
+    def prepareFramePath(self):
+        """
+        摄像头打开后先读一帧拿到分辨率，按固定尺寸预分配缓冲和纹理；重新打开之前尺寸不会变
+        """
+        try:
+            frame = self.camera.read()
+        except RuntimeError as e:
+            logger.warning(f"打开后首帧读取失败: {e}")
+            self.rawFrameSize = None  # 交给采集线程用第一帧补上
+            self.updateFrameSizes()
+            return
 
-    def readFrameThreadFunction(self):
-        print("采集线程启动")
+        h, w = frame.shape[:2]
+        self.rawFrameSize = (w, h)
+        self.rawFrame = frame  # 需要缩放时原始帧解码到这里
+        self.updateFrameSizes()
 
-        while self.readFrameThreadIsRunning.is_set():
-            frame: ndarray | None = self.camera.read()
-            if frame is None:
-                time.sleep(0.001)  # 等价于 sleep_for(1ms)
-                continue
+        dw, dh = self.displaySize
+        self.frameBuffers = [np.empty((dh, dw, 3), dtype=np.uint8) for _ in range(2)]
+        self.frameSize = self.backFrameSize = self.displaySize
+        self.frameWidth, self.frameHeight = dw, dh
+        self.camWidget.prepareTexture(dw, dh, PixelFormat.BGR24)
 
-            # 子线程 → 主线程
-            self.signalFrame.emit(frame)
-            # rtc
-            self.put_latest(self.camToRtcQueue, frame)
+    def updateFrameSizes(self):
+        # 原始尺寸或窗口尺寸变了才调用，采集线程每帧直接读结果
+        self.displaySize = self.fitSize(self.rawFrameSize, self.displayTargetSize)
+        rtcSize = self.fitSize(self.rawFrameSize, self.RTC_MAX_SIZE)
+        # rtc 幀要轉 I420，寬高必須是偶數
+        self.rtcFrameSize = None if rtcSize is None else (rtcSize[0] & ~1, rtcSize[1] & ~1)
 
-        print("采集线程退出")
+    def onRenderWidgetResized(self, w: int, h: int):
+        self.displayTargetSize = (w, h)
+        self.updateFrameSizes()
 
-    def onFrameArrived(self, frame: ndarray):
+    @staticmethod
+    def initCaptureThread(core: int):
         """
-        接收到新的一幀影像時觸發
-        - 從 rtcToCamQueue 取出最新的位置資料
-        - 根據 class_name 畫不同顏色的框（cavity → 紅色，其他 → 綠色）
-        - 將畫好框的影像傳給 camWidget 顯示
+        采集线程的 initializer：先把 OpenCV 的并行线程池建好，再绑核
+
+        OpenCV 的工作线程在第一次并行调用时才创建，并继承创建者的亲和性；
+        采集线程是从已绑核的主线程派生的，所以要先放开，跑一次够大的 resize 把线程池拉起来，最后才绑到 core
+        """
+        unpin_current_thread()
+        cv2.resize(np.zeros((1080, 1920, 3), np.uint8), (960, 540), interpolation=cv2.INTER_AREA)
+        pin_current_thread(core)
+
+    @staticmethod
+    def fitSize(size: tuple[int, int] | None, limit: tuple[int, int] | None) -> tuple[int, int] | None:
+        """
+        把 size 等比缩小到 limit 以内（只缩不放，宽高取偶数）；没有 limit 时原样返回
         """
-        display_frame = frame.copy()  # 複製一份，避免修改原始 frame
+        if size is None or limit is None or limit[0] <= 0 or limit[1] <= 0:
+            return size
+        w, h = size
+        scale = min(limit[0] / w, limit[1] / h)
+        if scale >= 1.0:
+            return size
+        return max(2, int(w * scale) & ~1), max(2, int(h * scale) & ~1)
+
+    def captureFrame(self) -> bool:
+        """
+        在线程池里跑：grab 一帧，需要时解码并缩放进后台缓冲，顺带给 rtc 准备一帧
+
+        :return: 后台缓冲里是否有了新的一帧
+        """
+        # 只 grab 不解码，驱动缓冲里的旧帧直接丢掉
+        if not self.camera.grab():
+            time.sleep(0.01)  # 摄像头出错，退避一下
+            return False
+
+        # 主线程还没取走上一帧（或 camWidget 还没画出来）、rtc 也不要新帧 → 解码了也是白费
+        needRtc = self.rtcSender.wants_frame()
+        if (self.displayedGeneration != self.frameGeneration or self.camWidget.hasPendingFrame()) and not needRtc:
+            return False
+
+        back = self.frameBuffers[self.frameWriteIndex]
+        displaySize = self.displaySize
+        if displaySize == self.rawFrameSize:
+            # 不用缩放：直接解码进后台缓冲，不再每帧分配新 ndarray
+            ret, raw = self.camera.retrieve(back)
+            if not ret:
+                return False
+            back = raw
+        else:
+            ret, raw = self.camera.retrieve(self.rawFrame)
+            if not ret:
+                return False
+            self.rawFrame = raw
+            # INTER_AREA 缩小走 OpenCV 的 SIMD 路径，直接写进后台缓冲
+            back = cv2.resize(raw, displaySize, dst=back, interpolation=cv2.INTER_AREA)
+        self.frameBuffers[self.frameWriteIndex] = back  # 尺寸变了 OpenCV 会重新分配
+        self.backFrameSize = displaySize
+        if self.rawFrameSize is None:
+            # 打开时没读到首帧，用这一帧补上尺寸
+            self.rawFrameSize = self.backFrameSize = (raw.shape[1], raw.shape[0])
+            self.updateFrameSizes()
+
+        # rtc：在这里就转成编码器要的 I420，cvtColor 本身输出新数组，不用再 copy 后台缓冲
+        if needRtc:
+            rtcSize = self.rtcFrameSize
+            if rtcSize != self.rawFrameSize:
+                raw = cv2.resize(raw, rtcSize, interpolation=cv2.INTER_AREA)
+            self.rtcSender.push_frame(cv2.cvtColor(raw, cv2.COLOR_BGR2YUV_I420))
+
+        return True
+
+    async def captureLoop(self):
+        """
+        采集任务：阻塞的摄像头读取在 capturePool 里跑，拿到新帧后在主线程交换缓冲并分发
+        """
+        logger.info("采集任务启动")
+        loop = asyncio.get_running_loop()
 
         try:
-            # 非阻塞取出最新的位置資料
-            posStr: str | bytes | None = self.rtcToCamQueue.get_nowait()
-
-            if posStr:
-                # 處理 bytes → str
-                if isinstance(posStr, bytes):
-                    posStr = posStr.decode('utf-8')
-
-                # 解析 JSON
-                posJson: Any = json.loads(posStr)
-
-                # 取出 detections 列表
-                detections = posJson.get("detections", [])
-
-                for det in detections:
-                    # 取出 bbox [x1, y1, x2, y2]
-                    bbox = det.get("bbox")
-                    if not isinstance(bbox, list) or len(bbox) != 4:
-                        logger.warning(f"無效的 bbox 格式: {bbox}")
-                        continue
-
-                    try:
-                        x1, y1, x2, y2 = map(int, bbox)
-                    except (ValueError, TypeError):
-                        logger.warning(f"無法轉換 bbox 座標: {bbox}")
-                        continue
-
-                    # 根據 class_name 決定顏色
-                    class_name = det.get("class_name", "unknown").lower()  # 轉小寫防大小寫差異
-                    confidence = det.get("confidence", 0.0)
-
-                    if "cavity" in class_name:  # 包含 "cavity" 就算（可精確改成 == "cavity"）
-                        color = (0, 0, 255)  # BGR 紅色
-                        label_color = (0, 0, 255)
-                    else:
-                        color = (0, 255, 0)  # BGR 綠色
-                        label_color = (0, 255, 0)
-
-                    # 畫矩形框
-                    cv2.rectangle(
-                        display_frame,
-                        (x1, y1),
-                        (x2, y2),
-                        color,
-                        3  # 粗一點更明顯，2 → 3
-                    )
-
-                    # 畫標籤：類別名稱 + 信心度
-                    label = f"{det.get('class_name', 'unknown')} {confidence:.2f}"
-                    # 文字背景（可選，讓文字更清楚）
-                    text_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
-                    text_bg = (x1, y1 - 25, x1 + text_size[0], y1 - 5)
-                    cv2.rectangle(display_frame, (text_bg[0], text_bg[1]), (text_bg[2], text_bg[3]), (0, 0, 0),
-                                  -1)  # 黑色背景
-
-                    cv2.putText(
-                        display_frame,
-                        label,
-                        (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.7,
-                        label_color,
-                        2
-                    )
-
-                    # 可選：畫 object_id
-                    obj_id = det.get("object_id")
-                    if obj_id is not None:
-                        cv2.putText(
-                            display_frame,
-                            f"ID:{obj_id}",
-                            (x1, y2 + 20),  # 框下方
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.6,
-                            (255, 255, 255),  # 白色
-                            2
-                        )
-
-        except Empty:
-            pass  # 無新資料，保持原樣
-
-        except json.JSONDecodeError as e:
-            logger.warning(f"JSON 解析失敗: {e}")
+            while True:
+                if not await loop.run_in_executor(self.capturePool, self.captureFrame):
+                    continue
+
+                # 交换前后台；和 onFrameArrived 同在主线程，不用加锁
+                self.frameWriteIndex ^= 1
+                self.frameGeneration += 1
+                if self.backFrameSize != self.frameSize:
+                    # 只有窗口缩放等尺寸变化时才更新缓存的宽高
+                    self.frameSize = self.backFrameSize
+                    self.frameWidth, self.frameHeight = self.frameSize
+
+                self.signalFrame.emit(self.frameGeneration)
+        finally:
+            logger.info("采集任务退出")
+
+    def onFrameArrived(self, generation: int):
+        """
+        接收到新的一幀影像時觸發
+        - 讀前台緩衝（可能已經比 generation 新）
+        - 把最新的檢測結果交給 camWidget，由 GPU 疊加在畫面上
+        - 將原始影像傳給 camWidget 顯示
+        """
+        if self.displayedGeneration == self.frameGeneration:
+            return  # 這一幀已經被前一次觸發順帶顯示了
+        self.displayedGeneration = self.frameGeneration
+        display_frame = self.frameBuffers[self.frameWriteIndex ^ 1]
 
-        except Exception as e:
-            logger.error(f"onFrameArrived 錯誤: {e}", exc_info=True)
+        self.updateOverlay(self.frameWidth, self.frameHeight)
 
-        # 最後傳給 widget
-        h, w = display_frame.shape[:2]
+        # 最後傳給 widget，寬高用打開攝像頭時就確定的值
         self.camWidget.setTextureData(
             display_frame,
-            w,
-            h,
+            self.frameWidth,
+            self.frameHeight,
             PixelFormat.BGR24
         )
 
-    def stopReadFrameThreadFunction(self):
-        self.readFrameThreadIsRunning.clear()
+    def updateOverlay(self, fw: int, fh: int):
+        """
+        把最新的檢測結果轉成 camWidget 的疊加層，框和文字都不再畫進影像
+        - 從 rtcToCamSlot 取出最新的位置資料，沒有新結果就清掉疊加層
+        - 根據 class_name 選顏色（cavity → 紅色，其他 → 綠色）
+        - 檢測座標是相對送去 rtc 的幀，按顯示幀 (fw, fh) 換算
+        """
+        try:
+            # 非阻塞取出最新的位置資料
+            # RTCSender 已經解析好 JSON，這裡直接拿 dict
+            posJson: dict | None = self.rtcToCamSlot.get()
+            if not posJson:
+                self.camWidget.clearOverlay()
+                return
+
+            # 取出 detections 列表
+            detections = posJson.get("detections", [])
+
+            boxes: list[tuple[int, int, int, int]] = []
+            colors: list[tuple[int, int, int]] = []
+            labels: list[tuple[str, tuple[int, int, int], Any]] = []
+            for det in detections:
+                # 取出 bbox [x1, y1, x2, y2]
+                bbox = det.get("bbox")
+                if not isinstance(bbox, list) or len(bbox) != 4:
+                    self.warningThrottle.warn(f"無效的 bbox 格式: {bbox}")
+                    continue
+
+                try:
+                    x1, y1, x2, y2 = map(int, bbox)
+                except (ValueError, TypeError):
+                    self.warningThrottle.warn(f"無法轉換 bbox 座標: {bbox}")
+                    continue
+
+                # 根據 class_name 決定顏色
+                class_name = det.get("class_name", "unknown")
+                confidence = det.get("confidence", 0.0)
+
+                isCavity = self.classIsCavity.get(class_name)
+                if isCavity is None:
+                    # 轉小寫防大小寫差異，包含 "cavity" 就算（可精確改成 == "cavity"）
+                    isCavity = self.classIsCavity[class_name] = "cavity" in class_name.lower()
+                color = (255, 0, 0) if isCavity else (0, 255, 0)  # RGB 紅色 / 綠色
+
+                boxes.append((x1, y1, x2, y2))
+                colors.append(color)
+                # 標籤：類別名稱 + 信心度，可選的 object_id 畫在框下方
+                labels.append((f"{class_name} {confidence:.2f}", color, det.get("object_id")))
+
+            if not boxes:
+                self.camWidget.clearOverlay()
+                return
+
+            boxArr = np.asarray(boxes, dtype=np.float32)
+            if self.rtcFrameSize is not None and self.rtcFrameSize != (fw, fh):
+                rw, rh = self.rtcFrameSize
+                boxArr *= (fw / rw, fh / rh, fw / rw, fh / rh)
+
+            self.camWidget.setOverlay(boxArr, colors, labels)
+
+        except Exception as e:
+            logger.error(f"updateOverlay 錯誤: {e}", exc_info=True)
+
+    def stopCaptureTask(self) -> Future:
+        """
+        取消采集任务并关摄像头
+
+        取消任务不会打断线程池里正在跑的 grab/retrieve，所以 close 也丢进单线程的 capturePool，
+        按提交顺序一定排在它之后执行
 
-        if self.readFrameThread is not None:
-            self.readFrameThread.join(timeout=1.0)
-            self.readFrameThread = None
+        :return: close 的 future，要重开摄像头先等它完成
+        """
+        if self.captureTask is not None:
+            self.captureTask.cancel()
+            self.captureTask = None
+        return self.capturePool.submit(self.camera.close)
 
     def openOrCloseDetection(self):
         if self.rtcSenderIsRunning.is_set():
@@ -330,7 +473,7 @@ class MainWindow(QMainWindow):
             self.mStatusText.setText(self.STATUS_STOPPED)
             self.mStatusText.setStyleSheet("color: gray;")  # 可選：變灰色表示停止
 
-            print("RTC Detection 已關閉")
+            logger.info("RTC Detection 已關閉")
 
         else:
             # 沒運行 → 開啟（先檢查相機）
@@ -344,19 +487,11 @@ class MainWindow(QMainWindow):
             self.mStatusText.setText(self.STATUS_STARTING)
             self.mStatusText.setStyleSheet("color: blue;")
 
-            def readCameraCallBack() -> ndarray | None:
-                if not self.camera.is_opened():
-                    return None
-                try:
-                    return self.camToRtcQueue.get_nowait()  # 取最新幀
-                except Empty:
-                    return None
-
-            def readRTCFunc(msg: str | bytes):
-                self.put_latest(self.rtcToCamQueue, msg)
+            def readRTCFunc(msg: dict):
+                self.rtcToCamSlot.put(msg)
 
             try:
-                self.rtcSender.open(readCameraCallBack, readRTCFunc)
+                self.rtcSender.open(readRTCFunc)
                 self.rtcSenderIsRunning.set()
                 self.openOrCloseDetBtn.setText(self.tr("Detection running"))
 
@@ -364,29 +499,17 @@ class MainWindow(QMainWindow):
                 self.mStatusText.setText(self.STATUS_CONNECTING)
                 self.mStatusText.setStyleSheet("color: orange;")
 
-                print("RTC Detection 已啟動")
+                logger.info("RTC Detection 已啟動")
 
             except Exception as e:
                 error_msg = f"啟動失敗: {str(e)}"
-                print(error_msg)
+                logger.error(error_msg)
                 self.mStatusText.setText(self.STATUS_FAILED)
                 self.mStatusText.setStyleSheet("color: red;")
                 QMessageBox.critical(self, "錯誤", error_msg)
                 # 恢復按鈕
                 self.openOrCloseDetBtn.setText(self.tr("Open Detection"))
 
-    @staticmethod
-    def put_latest(queue, item):
-        while True:
-            try:
-                queue.put_nowait(item)
-                break
-            except Full:
-                try:
-                    _ = queue.get_nowait()  # 清掉旧值
-                except Empty:
-                    break
-
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -1,13 +1,16 @@
 # RTCSender.py
 import asyncio
-import json
+import functools
 import logging
 import ssl
-from typing import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable
 
 import aiomqtt
 import av
+import msgpack
 import numpy as np
+import orjson
 from aiortc import (
     RTCPeerConnection,
     RTCConfiguration,
@@ -18,20 +21,33 @@ from aiortc import (
 )
 
 from ConfigClient import load_ice_servers
+from LatestSlot import LatestSlot
+from ThreadAffinity import unpin_current_thread
+from WarningThrottle import WarningThrottle
+
+try:
+    import zstandard
+except ImportError:  # zstandard 是可选依赖，只有開了信令壓縮才需要
+    zstandard = None
+
+# offer 只在發起連線時壓一次，模組級共用一個壓縮器
+_zstd = zstandard.ZstdCompressor(level=1) if zstandard else None
 
 # ==============================
 # 設定 logging，方便看問題
 # ==============================
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("RTCSender")
+logger = logging.getLogger(__name__)
 
-# 你的 STUN/TURN（請確認 124.71.218.178:3478 真的可用）
-ice_server_dicts = asyncio.run(load_ice_servers("http://127.0.0.1:8080"))
-print(ice_server_dicts)
-RTC_CONFIG = RTCConfiguration(iceServers=[RTCIceServer(**d) for d in ice_server_dicts])
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"  # zstd 幀頭，收到的 answer 以它開頭就先解壓
+ZSTD_MAX_OUTPUT = 1 << 20  # 對端串流壓縮時幀頭裡沒有原始大小，解壓需要一個上限
+DC_BATCH_WINDOW = 0.005  # send() 在這個時間窗內的消息合成一個 DataChannel 包
+DC_OUTBOX_SIZE = 256  # 待發隊列上限，對端跟不上時丟最舊的
 
 
+@functools.lru_cache(maxsize=1)
 def create_ssl_context():
+    # 整個程式共用一個 context，每次重連不用重新載入系統 CA
     ctx = ssl.create_default_context()
     ctx.check_hostname = True
     ctx.verify_mode = ssl.CERT_REQUIRED
@@ -39,55 +55,150 @@ def create_ssl_context():
 
 
 class CameraTrack(VideoStreamTrack):
-    def __init__(self, read_func: Callable[[], np.ndarray | None], fps: int = 30):
+    def __init__(self, executor: Executor, fps: int = 30):
         super().__init__()
-        self.read_func = read_func
+        # 生產者用 put_frame 推 I420 幀 (h*3/2, w)：幀放進單槽（只留最新），再叫醒 recv
+        self.loop = asyncio.get_running_loop()
+        self.slot: LatestSlot = LatestSlot()
+        self.frame_ready = asyncio.Event()
+        self.executor = executor  # ndarray → VideoFrame 的轉換在這裡跑，不佔事件循環
         self.frame_interval = 1.0 / fps
+        # 沒幀時送的黑屏，按最後一次正常幀的尺寸建一次就重複用
+        self.last_shape: tuple[int, ...] = (480 * 3 // 2, 640)
+        self.black_shape: tuple[int, ...] | None = None
+        self.black_frame: av.VideoFrame | None = None
+
+    def put_frame(self, frame: np.ndarray):
+        """可從任何線程調用；還沒送出的舊幀直接被覆蓋"""
+        self.slot.put(frame)
+        self.loop.call_soon_threadsafe(self.frame_ready.set)
+
+    async def next_frame(self) -> np.ndarray | None:
+        # 最多等兩個幀間隔，等不到回 None
+        deadline = self.loop.time() + self.frame_interval * 2
+        while True:
+            # 先 clear 再取：兩步之間放進來的幀一定會再 set 一次，不會漏掉
+            self.frame_ready.clear()
+            frame = self.slot.get()
+            remaining = deadline - self.loop.time()
+            if frame is not None or remaining <= 0:
+                return frame
+            try:
+                await asyncio.wait_for(self.frame_ready.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def black_video_frame(self) -> av.VideoFrame:
+        # 編碼器在下一次 recv 之前就用完了上一幀，同一個 VideoFrame 只改 pts 重送沒問題
+        black = self.black_frame
+        if black is None or self.black_shape != self.last_shape:
+            # I420 的黑色：Y 平面 0，U/V 平面 128
+            yuv = np.full(self.last_shape, 128, dtype=np.uint8)
+            yuv[:self.last_shape[0] * 2 // 3] = 0
+            black = self.black_frame = self.to_video_frame(yuv)
+            self.black_shape = self.last_shape
+        return black
+
+    @staticmethod
+    def to_video_frame(frame: np.ndarray) -> av.VideoFrame:
+        # 生產者已經轉好 I420，這裡只是拷進 VideoFrame 的平面，編碼器不用再 swscale
+        return av.VideoFrame.from_ndarray(frame, format="yuv420p")
 
     async def recv(self):
         pts, time_base = await self.next_timestamp()
 
-        # 避免無限卡住，最多等一小段時間
-        for _ in range(int(self.frame_interval * 1000 / 5)):  # 最多等 ~frame_interval
-            frame = self.read_func()
-            if frame is not None:
-                break
-            await asyncio.sleep(0.005)
-        else:
+        frame = await self.next_frame()
+        if frame is None:
             # 沒拿到畫面就給黑屏（避免下游崩潰）
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-
-        video_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
+            video_frame = self.black_video_frame()
+        else:
+            self.last_shape = frame.shape
+            video_frame = await asyncio.get_running_loop().run_in_executor(self.executor, self.to_video_frame, frame)
         video_frame.pts = pts
         video_frame.time_base = time_base
         return video_frame
 
 
 class RTCSender:
-    def __init__(self, mqtt_topic_prefix: str = "user/aiwang23"):
+    def __init__(self, mqtt_topic_prefix: str = "user/aiwang23", compress_signalling: bool = False):
+        """
+        :param compress_signalling: offer 用 zstd 壓縮後發到 {prefix}/offer/zstd，需要對端支援；
+                                    answer 不管開不開都會按幀頭自動解壓
+        """
+        if compress_signalling and zstandard is None:
+            raise RuntimeError("compress_signalling 需要先 pip install zstandard")
         self.pc: RTCPeerConnection | None = None
-        self.topic_offer = f"{mqtt_topic_prefix}/offer"
+        self.compress_signalling = compress_signalling
+        self.topic_offer = f"{mqtt_topic_prefix}/offer/zstd" if compress_signalling else f"{mqtt_topic_prefix}/offer"
         self.topic_answer = f"{mqtt_topic_prefix}/answer"
         self.mqtt_hostname = "broker.emqx.io"
         self.mqtt_port = 8883
-        self._running = False
+        self._loop: asyncio.AbstractEventLoop | None = None  # _run 所在的事件循環，close() 從其他線程也往這裡投遞
+        self._task: asyncio.Task | None = None
+        self._outbox: asyncio.Queue | None = None  # send() 的待發消息；只在 DataChannel 開著、有批量任務在發時才有
+        self._track: CameraTrack | None = None
+        # 只開一條線程做幀轉換，保證順序；主線程可能綁了核，線程啟動時先放開
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rtc-frame",
+                                            initializer=unpin_current_thread)
+
+    def open(self, readRTCFunc: Callable[[dict], None]):
+        """從同步程式碼啟動；影像用 push_frame 推進來"""
+        self._loop = asyncio.get_running_loop()
+        self._task = self._loop.create_task(self._run(readRTCFunc))
+
+    def wants_frame(self) -> bool:
+        """CameraTrack 的槽空著才值得準備下一幀；可從任何線程調用"""
+        track = self._track
+        return track is not None and track.slot.empty()
+
+    def push_frame(self, frame: np.ndarray):
+        """
+        把最新一幀交給 CameraTrack；可從任何線程調用，沒在推流時直接丟掉
+
+        :param frame: I420 (h*3/2, w) uint8，例如 cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420)
+        """
+        track = self._track
+        if track is not None:
+            track.put_frame(frame)
+
+    def send(self, msg: Any):
+        """
+        經 DataChannel 發給對端；可從任何線程調用，沒在連線時直接丟掉
+
+        :param msg: 能被 msgpack 打包的對象，5 ms 內的消息合成一個列表一起發
+        """
+        outbox, loop = self._outbox, self._loop
+        if outbox is None or loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._enqueue, outbox, msg)
+        except RuntimeError:
+            pass  # 事件循環已經關了，當作沒在連線
 
-    def open(
-        self,
-        readCameraFunc: Callable[[], np.ndarray | None],
-        readRTCFunc: Callable[[str | bytes], None],
-    ):
-        """從同步程式碼啟動"""
-        asyncio.create_task(self._run(readCameraFunc, readRTCFunc))
+    @staticmethod
+    def _enqueue(outbox: asyncio.Queue, msg: Any):
+        # 在事件循環上跑；隊列滿了先丟最舊的一條
+        if outbox.full():
+            outbox.get_nowait()
+        outbox.put_nowait(msg)
 
     def close(self):
-        self._running = False
-        if self.pc:
-            asyncio.create_task(self.pc.close())
-            self.pc = None
-
-    async def _create_peer_connection(self):
-        pc = RTCPeerConnection(configuration=RTC_CONFIG)
+        """
+        可從任何線程調用，不會阻塞：只把 _run 取消掉，pc 由 _run 的 finally 在自己的事件循環上關
+        """
+        task, loop = self._task, self._loop
+        if task is None or loop is None or task.done():
+            return
+        loop.call_soon_threadsafe(task.cancel)
+
+    async def _create_peer_connection(self, stop_event: asyncio.Event):
+        # 你的 STUN/TURN（請確認 124.71.218.178:3478 真的可用）
+        # 每次連線都向配置伺服器重新拿，走共用的 ConfigClient 連線池
+        ice_server_dicts = await load_ice_servers()
+        logger.info(f"ICE servers: {ice_server_dicts}")
+        rtc_config = RTCConfiguration(iceServers=[RTCIceServer(**d) for d in ice_server_dicts])
+
+        pc = RTCPeerConnection(configuration=rtc_config)
         self.pc = pc
 
         @pc.on("iceconnectionstatechange")
@@ -107,63 +218,29 @@ class RTCSender:
                 logger.error("PeerConnection failed！通常是 DTLS 或 codec 問題")
             elif pc.connectionState == "connected":
                 logger.info("WebRTC 連線成功！")
+            if pc.connectionState in ("closed", "failed"):
+                stop_event.set()  # 只通知建立這個 pc 的那一次 _run
 
         return pc
 
-    async def _run(
-        self,
-        readCameraFunc: Callable[[], np.ndarray | None],
-        readRTCFunc: Callable[[str | bytes], None],
-    ):
-        self._running = True
+    async def _run(self, readRTCFunc: Callable[[dict], None]):
+        pc: RTCPeerConnection | None = None
+        # 每次連線各用一個；舊 pc 收尾時發的 closed 不會誤停 close() 後馬上 open() 的新連線
+        stop_event = asyncio.Event()
 
         try:
             ssl_ctx = create_ssl_context()
-            pc = await self._create_peer_connection()
+            pc = await self._create_peer_connection(stop_event)
             logger.info("PeerConnection 已建立")
 
             # 加 track
-            track = CameraTrack(readCameraFunc, fps=25)  # 建議 25～30 fps
+            track = CameraTrack(self._executor, fps=25)  # 建議 25～30 fps
             pc.addTrack(track)
+            self._track = track
             logger.info("已加入 VideoTrack")
 
             await self._craete_data_channel(pc, readRTCFunc)
 
-            async def recv_answer_task():
-                # 收 answer（加上 timeout 避免永遠卡住）
-                answer_json_str = None
-                async with aiomqtt.Client(
-                    hostname=self.mqtt_hostname,
-                    port=self.mqtt_port,
-                    tls_context=ssl_ctx,
-                ) as client:
-                    await client.subscribe(self.topic_answer, qos=2)
-                    logger.info(f"已訂閱 {self.topic_answer}，等待 answer...")
-
-                    try:
-                        async with asyncio.timeout(25):  # 最多等 25 秒
-                            async for message in client.messages:
-                                answer_json_str = message.payload.decode()
-                                logger.info("收到 answer")
-                                break
-                    except asyncio.TimeoutError:
-                        logger.error("等待 answer 超時（25秒）")
-                        return
-
-                if not answer_json_str:
-                    logger.error("沒有收到 answer")
-                    return
-
-                answer_data = json.loads(answer_json_str)
-                await pc.setRemoteDescription(
-                    RTCSessionDescription(
-                        sdp=answer_data["sdp"], type=answer_data["type"]
-                    )
-                )
-                logger.info("Remote Description (answer) 已設定")
-
-            asyncio.create_task(recv_answer_task())
-
             # 產生 offer
             offer = await pc.createOffer()
             await pc.setLocalDescription(offer)
@@ -173,64 +250,165 @@ class RTCSender:
                 "type": pc.localDescription.type,
                 "sdp": pc.localDescription.sdp,
             }
-            offer_json = json.dumps(offer_dict)
-            # 送 offer
+            offer_payload = orjson.dumps(offer_dict)  # 直接是 bytes，aiomqtt 可以原樣發
+            if self.compress_signalling:
+                # SDP 是好幾 KB 的純文字，level 1 就能壓到原來的幾分之一
+                offer_payload = _zstd.compress(offer_payload)
+
+            # 信令只用一條 MQTT 連線：先訂閱 answer 再送 offer，answer 不會在訂閱前就到
+            answer_payload = None
             async with aiomqtt.Client(
                 hostname=self.mqtt_hostname,
                 port=self.mqtt_port,
                 tls_context=ssl_ctx,
             ) as client:
+                await client.subscribe(self.topic_answer, qos=1)
+                logger.info(f"已訂閱 {self.topic_answer}")
+
                 await client.publish(
                     self.topic_offer,
-                    payload=offer_json.encode(),
-                    qos=2,  # offer
+                    payload=offer_payload,
+                    qos=1,  # offer：at-least-once 就夠，重複的 answer 也只取第一條
                 )
-                logger.info(f"Offer 已發送到 {self.topic_offer}")
+                logger.info(f"Offer 已發送到 {self.topic_offer}，等待 answer...")
 
-            # 保持連線，直到被外部關閉或 ICE 斷掉
-            while self._running and pc.connectionState not in ("closed", "failed"):
-                await asyncio.sleep(1.5)
+                # 收 answer（加上 timeout 避免永遠卡住）
+                try:
+                    async with asyncio.timeout(25):  # 最多等 25 秒
+                        async for message in client.messages:
+                            payload = message.payload
+                            if payload[:4] == ZSTD_MAGIC and zstandard is not None:
+                                payload = zstandard.ZstdDecompressor().decompress(
+                                    payload, max_output_size=ZSTD_MAX_OUTPUT)
+                            answer_payload = payload
+                            logger.info("收到 answer")
+                            break
+                except asyncio.TimeoutError:
+                    logger.error("等待 answer 超時（25秒）")
+                    return
+
+            if not answer_payload:
+                logger.error("沒有收到 answer")
+                return
+
+            answer_data = orjson.loads(answer_payload)
+            await pc.setRemoteDescription(
+                RTCSessionDescription(
+                    sdp=answer_data["sdp"], type=answer_data["type"]
+                )
+            )
+            logger.info("Remote Description (answer) 已設定")
+
+            # 保持連線，直到被外部關閉或 ICE 斷掉；不再每 1.5 秒輪詢一次狀態
+            if pc.connectionState not in ("closed", "failed"):
+                await stop_event.wait()
 
         except Exception as e:
             logger.exception("RTCSender 發生錯誤")
         finally:
-            self._running = False
-            if self.pc:
-                await self.pc.close()
+            # close() 之後馬上又 open() 時，新的 _run 已經在跑，別把它的狀態清掉
+            if self._task is asyncio.current_task():
+                self._track = None
+                self._outbox = None
+                self._loop = None
+            if pc is not None:
+                await pc.close()
+            if self.pc is pc:
                 self.pc = None
             logger.info("RTCSender 結束")
 
     async def _craete_data_channel(
-        self, pc: RTCPeerConnection, readRTCFunc: Callable[[str | bytes], None]
+        self, pc: RTCPeerConnection, readRTCFunc: Callable[[dict], None]
     ) -> RTCDataChannel:
         dc = pc.createDataChannel("pos")
+        outbox: asyncio.Queue | None = None
+        batch_task: asyncio.Task | None = None
+        throttle = WarningThrottle(logger)
+
+        def deliver(data: Any):
+            # 只把 dict 交給 UI；對端發錯格式時限流記警告，免得按幀刷屏
+            if isinstance(data, dict):
+                readRTCFunc(data)
+            else:
+                throttle.warn(f"DataChannel 消息不是物件，已丟棄: {type(data).__name__}")
 
         @dc.on("open")
         async def on_open():
+            nonlocal outbox, batch_task
             logger.info("DataChannel 已開啟")
+            outbox = asyncio.Queue(maxsize=DC_OUTBOX_SIZE)
+            batch_task = asyncio.ensure_future(self._send_batches(dc, outbox))
+            self._outbox = outbox  # 開了之後 send() 才開始收
+
+        @dc.on("close")
+        def on_close():
+            if self._outbox is outbox:
+                self._outbox = None
+            if batch_task:
+                batch_task.cancel()
 
         @dc.on("message")
         async def on_message(message: bytes | str):
-            logger.info(f"DataChannel recv: {message}")
-            readRTCFunc(message)
+            logger.debug(f"DataChannel recv: {message}")
+            # 只在這裡解析一次，之後以 dict 交給 UI，UI 線程不用再每幀 json.loads
+            if isinstance(message, bytes):
+                # 二進制幀是 msgpack：列表是對端批量發的，逐條交出去；否則就是單條消息
+                try:
+                    data = msgpack.unpackb(message)
+                except (ValueError, msgpack.UnpackException):
+                    pass  # 不是 msgpack，按 JSON 解析
+                else:
+                    if isinstance(data, list):
+                        for item in data:
+                            deliver(item)
+                    else:
+                        deliver(data)
+                    return
+            try:
+                data = orjson.loads(message)
+            except orjson.JSONDecodeError as e:
+                logger.warning(f"DataChannel 消息 JSON 解析失敗: {e}")
+                return
+            deliver(data)
 
         return dc
 
+    @staticmethod
+    async def _send_batches(dc: RTCDataChannel, outbox: asyncio.Queue):
+        # 等到第一條消息後再等一個時間窗，把這期間的消息打成一個 msgpack 包，一個包只佔一條 SCTP 消息
+        while True:
+            batch = [await outbox.get()]
+            await asyncio.sleep(DC_BATCH_WINDOW)
+            while not outbox.empty():
+                batch.append(outbox.get_nowait())
+            if dc.readyState != "open":
+                return
+            dc.send(msgpack.packb(batch))
+
 
 # 使用範例
 if __name__ == "__main__":
-    sender = RTCSender(mqtt_topic_prefix="user/aiwang23")
+    import itertools
+
+    async def main():
+        sender = RTCSender(mqtt_topic_prefix="user/aiwang23")
 
-    # 假的讀取函數（請換成你真的來源，例如 OpenCV 的 cap.read()）
-    def fake_read():
-        return np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+        # 假的影像來源（請換成你真的來源，例如 OpenCV 的 cap.read()）
+        # 亂數幀先生成一批循環用，不在每幀都跑一次 RNG
+        rng = np.random.default_rng()
+        frames = itertools.cycle([rng.integers(0, 255, (480 * 3 // 2, 640), dtype=np.uint8) for _ in range(32)])
 
-    sender.open(fake_read)
+        sender.open(lambda msg: logger.info(f"收到檢測結果: {msg}"))
+
+        # 讓它跑一段時間
+        try:
+            for _ in range(120 * 25):
+                sender.push_frame(next(frames))
+                await asyncio.sleep(1 / 25)
+        finally:
+            sender.close()
 
-    # 讓它跑一段時間
     try:
-        asyncio.run(asyncio.sleep(120))
+        asyncio.run(main())
     except KeyboardInterrupt:
         pass
-    finally:
-        sender.close()
@@ -1,9 +1,11 @@
 # RenderWidget.py
 from enum import Enum
-from typing import Union, List
+from typing import Any, List, Optional, Sequence, Tuple, Union
 import numpy as np
+from PySide6.QtCore import QPointF, QRectF, Signal
+from PySide6.QtGui import QColor, QPainter
 from PySide6.QtOpenGL import QOpenGLTexture, QOpenGLShaderProgram, QOpenGLShader, QOpenGLVertexArrayObject, \
-    QOpenGLBuffer
+    QOpenGLBuffer, QOpenGLPixelTransferOptions
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
 
 GLVERSION = "#version 330 core\n"
@@ -20,35 +22,78 @@ void main()
 }
 """
 
-fragment_shader_src = GLVERSION + """
+fragment_shader_rgb_src = GLVERSION + """
 in vec2 TexCoord;
 out vec4 FragColor;
 
-uniform sampler2D textureY;
-uniform sampler2D textureU;
-uniform sampler2D textureV;
-uniform bool isYUV;
+uniform sampler2D frameTexture;
 
 void main()
 {
-    if (isYUV) {
-        // 全范围YUV (0-255) 到 RGB 转换
-        float y = texture(textureY, TexCoord).r;
-        float u = texture(textureU, TexCoord).r - 0.5;
-        float v = texture(textureV, TexCoord).r - 0.5;
-
-        // JPEG/全范围 YUV 转换矩阵
-        float r = y + 1.140 * v;
-        float g = y - 0.395 * u - 0.581 * v;
-        float b = y + 2.032 * u;
-
-        FragColor = vec4(clamp(r, 0.0, 1.0), clamp(g, 0.0, 1.0), clamp(b, 0.0, 1.0), 1.0);
-    } else {
-        FragColor = texture(textureY, TexCoord);
-    }
+    FragColor = texture(frameTexture, TexCoord);
 }
 """
 
+fragment_shader_yuv_src = GLVERSION + """
+in vec2 TexCoord;
+out vec4 FragColor;
+
+uniform sampler2D frameTexture;  // (w, h*3/2) 的 I420 打包纹理：Y 平面后面紧跟 U、V
+
+void main()
+{
+    ivec2 texSize = textureSize(frameTexture, 0);
+    int w = texSize.x;
+    int h = texSize.y * 2 / 3;
+
+    // Y：上面 h 行，线性采样，纵向不越过最后半行以免混进 U
+    float yRow = min(TexCoord.y * float(h), float(h) - 0.5);
+    float y = texture(frameTexture, vec2(TexCoord.x, yRow / float(texSize.y))).r;
+
+    // U/V：各 (w/2)*(h/2) 字节，按行宽 w 连续排在 Y 后面，用线性下标取
+    ivec2 c = min(ivec2(TexCoord * vec2(w / 2, h / 2)), ivec2(w / 2 - 1, h / 2 - 1));
+    int uIdx = c.y * (w / 2) + c.x;
+    int vIdx = uIdx + (w / 2) * (h / 2);
+    float u = texelFetch(frameTexture, ivec2(uIdx % w, h + uIdx / w), 0).r - 0.5;
+    float v = texelFetch(frameTexture, ivec2(vIdx % w, h + vIdx / w), 0).r - 0.5;
+
+    // JPEG/全范围 YUV (0-255) 到 RGB 转换矩阵
+    float r = y + 1.140 * v;
+    float g = y - 0.395 * u - 0.581 * v;
+    float b = y + 2.032 * u;
+
+    FragColor = vec4(clamp(r, 0.0, 1.0), clamp(g, 0.0, 1.0), clamp(b, 0.0, 1.0), 1.0);
+}
+"""
+
+overlay_vertex_shader_src = GLVERSION + """
+layout(location = 0) in vec2 aPos;
+layout(location = 1) in vec3 aColor;
+out vec3 Color;
+uniform vec2 u_scale;
+uniform vec2 u_frameSize;
+void main()
+{
+    // 帧像素坐标 -> NDC，再按 u_scale 跟画面一起做等比缩放
+    vec2 ndc = vec2(aPos.x / u_frameSize.x * 2.0 - 1.0, 1.0 - aPos.y / u_frameSize.y * 2.0);
+    gl_Position = vec4(ndc * u_scale, 0.0, 1.0);
+    Color = aColor;
+}
+"""
+
+overlay_fragment_shader_src = GLVERSION + """
+in vec3 Color;
+out vec4 FragColor;
+void main()
+{
+    FragColor = vec4(Color, 1.0);
+}
+"""
+
+# 每个框 4 条边，每条边是 [l, t, r, b] 矩形，拆成两个三角形共 6 个顶点
+_EDGE_XS = [0, 2, 0, 2, 2, 0]
+_EDGE_YS = [1, 1, 3, 1, 3, 3]
+
 
 class PixelFormat(Enum):
     YUV420P = 0
@@ -57,20 +102,39 @@ class PixelFormat(Enum):
 
 
 class RenderWidget(QOpenGLWidget):
+    signalResized: Signal = Signal(int, int)  # 设备像素宽高
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.m_shaderProgram = None
+        # 格式在上传时就确定了，RGB/YUV 各编一个程序，着色器里不再逐片元判断
+        self.m_programRGB = None
+        self.m_programYUV = None
         self.m_vao = None
         self.m_vbo = None
         self.m_width = 0
         self.m_height = 0
         self.m_scaleX = 1.0
         self.m_scaleY = 1.0
-        self.m_textureY = None
-        self.m_textureU = None
-        self.m_textureV = None
+        self.m_texture = None
         self.m_currentFormat = None
-        self.m_yuvPlanes = None
+        # YUV 走两块 PBO 轮流上传，驱动拷这一块时下一帧写另一块
+        self.m_pbos: List[QOpenGLBuffer] = []
+        self.m_pboIndex = 0
+        # setTextureData 只记下最新一帧，真正上传放到 paintGL；画之前来的新帧直接顶掉旧的
+        self.m_pending: Optional[Tuple[Any, int, int, PixelFormat]] = None
+        self.m_updateQueued = False
+        self.frameSwapped.connect(self.onFrameSwapped)
+        # 行宽是 w*3 或 w/2，不一定是 4 的倍数，按 1 字节对齐读
+        self.m_transferOptions = QOpenGLPixelTransferOptions()
+        self.m_transferOptions.setAlignment(1)
+        self.m_overlayProgram = None
+        self.m_overlayVao = None
+        self.m_overlayVbo = None
+        self.m_overlayVertices: Optional[np.ndarray] = None
+        self.m_overlayVertexCount = 0
+        self.m_overlayDirty = False
+        self.m_overlayBoxes: List[List[float]] = []
+        self.m_overlayLabels: List[Tuple[str, Tuple[int, int, int], Any]] = []
 
     def __del__(self):
         self.makeCurrent()
@@ -78,11 +142,17 @@ class RenderWidget(QOpenGLWidget):
             self.m_vao.destroy()
         if self.m_vbo:
             self.m_vbo.destroy()
-        for tex in (self.m_textureY, self.m_textureU, self.m_textureV):
-            if tex:
-                tex.destroy()
-        if self.m_shaderProgram:
-            del self.m_shaderProgram
+        if self.m_overlayVao:
+            self.m_overlayVao.destroy()
+        if self.m_overlayVbo:
+            self.m_overlayVbo.destroy()
+        self.destroyTextures()
+        if self.m_programRGB:
+            del self.m_programRGB
+        if self.m_programYUV:
+            del self.m_programYUV
+        if self.m_overlayProgram:
+            del self.m_overlayProgram
         self.doneCurrent()
 
     def updateAspectRatio(self):
@@ -98,84 +168,198 @@ class RenderWidget(QOpenGLWidget):
             self.m_scaleX = 1.0
             self.m_scaleY = windowAspect / videoAspect
 
-    def setTextureData(self, buffer: Union[np.ndarray, List[np.ndarray]], width: int, height: int, fmt: PixelFormat):
-        if width <= 0 or height <= 0:
+    def prepareTexture(self, width: int, height: int, fmt: PixelFormat):
+        """
+        按固定的尺寸/格式预先分配纹理；之后 setTextureData 尺寸格式不变时只上传数据
+        """
+        if width <= 0 or height <= 0 or not self.isValid():
+            return  # 还没 initializeGL，交给第一次 setTextureData
+        if self.m_texture and (width, height, fmt) == (self.m_width, self.m_height, self.m_currentFormat):
             return
-
         self.makeCurrent()
+        self.allocateTextures(width, height, fmt)
+        self.doneCurrent()
+
+    def allocateTextures(self, width: int, height: int, fmt: PixelFormat):
+        # 调用方负责 makeCurrent
         self.m_width = width
         self.m_height = height
         self.m_currentFormat = fmt
         self.updateAspectRatio()
 
-        for tex in (self.m_textureY, self.m_textureU, self.m_textureV):
-            if tex:
-                tex.destroy()
-        self.m_textureY = self.m_textureU = self.m_textureV = None
-        self.m_yuvPlanes = None
+        self.destroyTextures()
 
         if fmt in (PixelFormat.RGB24, PixelFormat.BGR24):
-            if not isinstance(buffer, np.ndarray) or buffer.ndim != 3 or buffer.shape[2] != 3:
-                raise ValueError("RGB/BGR 必须是 (h, w, 3) 的 ndarray")
+            self.m_texture = QOpenGLTexture(QOpenGLTexture.Target2D)
+            self.m_texture.setFormat(QOpenGLTexture.RGB8_UNorm)
+            self.m_texture.setSize(width, height)
+            self.m_texture.allocateStorage()
+            self.m_texture.setMinMagFilters(QOpenGLTexture.Linear, QOpenGLTexture.Linear)
 
-            self.m_textureY = QOpenGLTexture(QOpenGLTexture.Target2D)
-            self.m_textureY.setFormat(QOpenGLTexture.RGB8_UNorm)
-            self.m_textureY.setSize(width, height)
-            self.m_textureY.allocateStorage()
-            self.m_textureY.setMinMagFilters(QOpenGLTexture.Linear, QOpenGLTexture.Linear)
+        elif fmt == PixelFormat.YUV420P:
+            # 三个平面按 I420 顺序打包进一张 (w, h*3/2) 的单通道纹理，一次上传
+            self.m_texture = QOpenGLTexture(QOpenGLTexture.Target2D)
+            self.m_texture.setFormat(QOpenGLTexture.R8_UNorm)
+            self.m_texture.setSize(width, height * 3 // 2)
+            self.m_texture.allocateStorage()
+            self.m_texture.setMinMagFilters(QOpenGLTexture.Linear, QOpenGLTexture.Linear)
+
+            for _ in range(2):
+                pbo = QOpenGLBuffer(QOpenGLBuffer.PixelUnpackBuffer)
+                pbo.setUsagePattern(QOpenGLBuffer.StreamDraw)
+                pbo.create()
+                pbo.bind()
+                pbo.allocate(width * height * 3 // 2)
+                pbo.release()
+                self.m_pbos.append(pbo)
+        else:
+            raise ValueError("不支持的像素格式")
 
-            pixel_format = QOpenGLTexture.BGR if fmt == PixelFormat.BGR24 else QOpenGLTexture.RGB
-            data_bytes = buffer.astype(np.uint8).tobytes()
-            self.m_textureY.setData(pixel_format, QOpenGLTexture.UInt8, data_bytes)
+    def destroyTextures(self):
+        # 调用方负责 makeCurrent
+        if self.m_texture:
+            self.m_texture.destroy()
+        self.m_texture = None
+        for pbo in self.m_pbos:
+            pbo.destroy()
+        self.m_pbos = []
+        self.m_pboIndex = 0
+
+    def setTextureData(self, buffer: Union[np.ndarray, List[np.ndarray]], width: int, height: int, fmt: PixelFormat):
+        if width <= 0 or height <= 0:
+            return
 
+        if fmt in (PixelFormat.RGB24, PixelFormat.BGR24):
+            if not isinstance(buffer, np.ndarray) or buffer.ndim != 3 or buffer.shape[2] != 3:
+                raise ValueError("RGB/BGR 必须是 (h, w, 3) 的 ndarray")
         elif fmt == PixelFormat.YUV420P:
-            if not isinstance(buffer, list) or len(buffer) != 3:
-                raise ValueError("YUV420P 必须传入 [Y, U, V] 三个 ndarray 平面")
-            Y, U, V = buffer
-            if Y.shape != (height, width) or U.shape != (height // 2, width // 2) or V.shape != (height // 2,
-                                                                                                 width // 2):
-                raise ValueError("YUV420P 平面尺寸不符合要求")
-
-            self.m_textureY = QOpenGLTexture(QOpenGLTexture.Target2D)
-            self.m_textureY.setFormat(QOpenGLTexture.R8_UNorm)
-            self.m_textureY.setSize(width, height)
-            self.m_textureY.allocateStorage()
-            self.m_textureY.setMinMagFilters(QOpenGLTexture.Linear, QOpenGLTexture.Linear)
-            self.m_textureY.setData(QOpenGLTexture.Red, QOpenGLTexture.UInt8, Y.astype(np.uint8).tobytes())
-
-            self.m_textureU = QOpenGLTexture(QOpenGLTexture.Target2D)
-            self.m_textureU.setFormat(QOpenGLTexture.R8_UNorm)
-            self.m_textureU.setSize(width // 2, height // 2)
-            self.m_textureU.allocateStorage()
-            self.m_textureU.setMinMagFilters(QOpenGLTexture.Linear, QOpenGLTexture.Linear)
-            self.m_textureU.setData(QOpenGLTexture.Red, QOpenGLTexture.UInt8, U.astype(np.uint8).tobytes())
-
-            self.m_textureV = QOpenGLTexture(QOpenGLTexture.Target2D)
-            self.m_textureV.setFormat(QOpenGLTexture.R8_UNorm)
-            self.m_textureV.setSize(width // 2, height // 2)
-            self.m_textureV.allocateStorage()
-            self.m_textureV.setMinMagFilters(QOpenGLTexture.Linear, QOpenGLTexture.Linear)
-            self.m_textureV.setData(QOpenGLTexture.Red, QOpenGLTexture.UInt8, V.astype(np.uint8).tobytes())
-
-            self.m_yuvPlanes = (Y.astype(np.uint8).tobytes(), U.astype(np.uint8).tobytes(),
-                                V.astype(np.uint8).tobytes())
+            if isinstance(buffer, np.ndarray):
+                # 已经是 I420 打包好的 (h*3/2, w)，例如 cv2.COLOR_BGR2YUV_I420 的输出
+                if buffer.shape != (height * 3 // 2, width):
+                    raise ValueError("YUV420P 打包数据必须是 (h*3/2, w)")
+                planes = (buffer,)
+            else:
+                if not isinstance(buffer, list) or len(buffer) != 3:
+                    raise ValueError("YUV420P 必须传入 [Y, U, V] 三个 ndarray 平面或打包好的 ndarray")
+                Y, U, V = buffer
+                if Y.shape != (height, width) or U.shape != (height // 2, width // 2) or V.shape != (height // 2,
+                                                                                                     width // 2):
+                    raise ValueError("YUV420P 平面尺寸不符合要求")
+                planes = (Y, U, V)
+            buffer = planes
         else:
             raise ValueError("不支持的像素格式")
 
-        self.doneCurrent()
+        self.m_pending = (buffer, width, height, fmt)
+        if not self.m_updateQueued:
+            self.m_updateQueued = True
+            self.update()
+
+    def hasPendingFrame(self) -> bool:
+        """上一帧还没被 paintGL 取走；只读一个属性，可以在其他线程调用"""
+        return self.m_pending is not None
+
+    def onFrameSwapped(self):
+        self.m_updateQueued = False
+        if self.m_pending is not None:
+            # paintGL 之后又来了新帧
+            self.m_updateQueued = True
+            self.update()
+
+    def uploadPending(self):
+        # 在 paintGL 里调用，context 已经是当前的
+        buffer, width, height, fmt = self.m_pending
+        self.m_pending = None
+
+        # 尺寸格式没变就复用已有纹理，只上传数据
+        if not self.m_texture or (width, height, fmt) != (self.m_width, self.m_height, self.m_currentFormat):
+            self.allocateTextures(width, height, fmt)
+
+        # ndarray 直接走 buffer 协议交给 setData，不再先拷成 bytes；
+        # 已经是连续 uint8 时 ascontiguousarray 不拷贝
+        if fmt in (PixelFormat.RGB24, PixelFormat.BGR24):
+            pixel_format = QOpenGLTexture.BGR if fmt == PixelFormat.BGR24 else QOpenGLTexture.RGB
+            self.m_texture.setData(pixel_format, QOpenGLTexture.UInt8,
+                                   np.ascontiguousarray(buffer, dtype=np.uint8), self.m_transferOptions)
+        else:
+            self.uploadYUV(buffer, width, height)
+
+    def uploadYUV(self, planes: Tuple[np.ndarray, ...], width: int, height: int):
+        # 调用方负责 makeCurrent；平面依次写进 PBO 的 0、w*h、w*h*5/4，再一次 glTexSubImage2D 从 PBO 拷进纹理
+        pbo = self.m_pbos[self.m_pboIndex]
+        self.m_pboIndex ^= 1
+
+        pbo.bind()
+        offset = 0
+        for plane in planes:
+            plane = np.ascontiguousarray(plane, dtype=np.uint8)
+            pbo.write(offset, plane, plane.nbytes)
+            offset += plane.nbytes
+
+        f = self.context().functions()
+        f.glPixelStorei(0x0CF5, 1)  # GL_UNPACK_ALIGNMENT
+        self.m_texture.bind()
+        # 绑着 PBO 时最后一个参数是 PBO 里的偏移
+        f.glTexSubImage2D(0x0DE1, 0, 0, 0, width, height * 3 // 2,  # GL_TEXTURE_2D
+                          0x1903, 0x1401, 0)  # GL_RED, GL_UNSIGNED_BYTE
+        self.m_texture.release()
+        pbo.release()
+
+    def setOverlay(self, boxes: np.ndarray, colors: Sequence[Tuple[int, int, int]],
+                   labels: Sequence[Tuple[str, Tuple[int, int, int], Any]], thickness: float = 3.0):
+        """
+        设置叠加在画面上的检测框，框由 paintGL 的第二个 GL pass 画，文字用 QPainter 画
+
+        :param boxes: (N, 4)，[x1, y1, x2, y2]，当前帧的像素坐标
+        :param colors: 每个框的 RGB 颜色
+        :param labels: 每个框的 (文字, RGB 颜色, object_id 或 None)
+        :param thickness: 线宽，帧像素
+        """
+        b = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        n = b.shape[0]
+        if n == 0:
+            self.clearOverlay()
+            return
+
+        h = thickness / 2.0
+        x1, y1, x2, y2 = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+        rects = np.stack([
+            np.stack([x1 - h, y1 - h, x2 + h, y1 + h], axis=1),  # 上
+            np.stack([x1 - h, y2 - h, x2 + h, y2 + h], axis=1),  # 下
+            np.stack([x1 - h, y1 - h, x1 + h, y2 + h], axis=1),  # 左
+            np.stack([x2 - h, y1 - h, x2 + h, y2 + h], axis=1),  # 右
+        ], axis=1)  # (N, 4, 4)
+
+        vertices = np.empty((n, 4, 6, 5), dtype=np.float32)
+        vertices[..., 0] = rects[..., _EDGE_XS]
+        vertices[..., 1] = rects[..., _EDGE_YS]
+        vertices[..., 2:] = np.asarray(colors, dtype=np.float32).reshape(n, 1, 1, 3) / 255.0
+
+        self.m_overlayVertices = vertices.reshape(-1, 5)
+        self.m_overlayDirty = True
+        self.m_overlayBoxes = b.tolist()
+        self.m_overlayLabels = list(labels)
+        self.update()
+
+    def clearOverlay(self):
+        if self.m_overlayVertexCount == 0 and self.m_overlayVertices is None and not self.m_overlayLabels:
+            return
+        self.m_overlayVertices = None
+        self.m_overlayVertexCount = 0
+        self.m_overlayDirty = False
+        self.m_overlayBoxes = []
+        self.m_overlayLabels = []
         self.update()
 
     def clear(self):
+        self.m_pending = None
         self.makeCurrent()
-        for tex in (self.m_textureY, self.m_textureU, self.m_textureV):
-            if tex:
-                tex.destroy()
-        self.m_textureY = self.m_textureU = self.m_textureV = None
-        self.m_yuvPlanes = None
+        self.destroyTextures()
         self.m_width = self.m_height = 0
         self.m_currentFormat = None
         self.m_scaleX = self.m_scaleY = 1.0
         self.doneCurrent()
+        self.clearOverlay()
 
         # 触发重绘，paintGL 会清屏
         self.update()
@@ -184,10 +368,21 @@ class RenderWidget(QOpenGLWidget):
         f = self.context().functions()
         f.glClearColor(0.0, 0.0, 0.0, 1.0)
 
-        self.m_shaderProgram = QOpenGLShaderProgram(self)
-        self.m_shaderProgram.addShaderFromSourceCode(QOpenGLShader.Vertex, vertex_shader_src)
-        self.m_shaderProgram.addShaderFromSourceCode(QOpenGLShader.Fragment, fragment_shader_src)
-        self.m_shaderProgram.link()
+        self.m_programRGB = QOpenGLShaderProgram(self)
+        self.m_programRGB.addShaderFromSourceCode(QOpenGLShader.Vertex, vertex_shader_src)
+        self.m_programRGB.addShaderFromSourceCode(QOpenGLShader.Fragment, fragment_shader_rgb_src)
+        self.m_programRGB.link()
+
+        self.m_programYUV = QOpenGLShaderProgram(self)
+        self.m_programYUV.addShaderFromSourceCode(QOpenGLShader.Vertex, vertex_shader_src)
+        self.m_programYUV.addShaderFromSourceCode(QOpenGLShader.Fragment, fragment_shader_yuv_src)
+        self.m_programYUV.link()
+
+        # 采样器一直用 0 号纹理单元，链接后设一次，paintGL 不再每帧设
+        for program in (self.m_programRGB, self.m_programYUV):
+            program.bind()
+            program.setUniformValue("frameTexture", 0)
+            program.release()
 
         vertices = np.array([
             -1.0, -1.0, 0.0, 0.0, 1.0,
@@ -200,23 +395,53 @@ class RenderWidget(QOpenGLWidget):
         self.m_vao.create()
         self.m_vao.bind()
 
+        # 全屏四边形只在这里上传一次，之后只读
         self.m_vbo = QOpenGLBuffer(QOpenGLBuffer.VertexBuffer)
+        self.m_vbo.setUsagePattern(QOpenGLBuffer.StaticDraw)
         self.m_vbo.create()
         self.m_vbo.bind()
         self.m_vbo.allocate(vertices.tobytes(), vertices.nbytes)
 
-        self.m_shaderProgram.bind()
-        self.m_shaderProgram.enableAttributeArray(0)
-        self.m_shaderProgram.enableAttributeArray(1)
-        self.m_shaderProgram.setAttributeBuffer(0, 0x1406, 0, 3, 5 * 4)
-        self.m_shaderProgram.setAttributeBuffer(1, 0x1406, 3 * 4, 2, 5 * 4)
+        # 两个程序的顶点属性 location 一样，VAO 里记一份就够了
+        self.m_programRGB.bind()
+        self.m_programRGB.enableAttributeArray(0)
+        self.m_programRGB.enableAttributeArray(1)
+        self.m_programRGB.setAttributeBuffer(0, 0x1406, 0, 3, 5 * 4)
+        self.m_programRGB.setAttributeBuffer(1, 0x1406, 3 * 4, 2, 5 * 4)
 
         self.m_vao.release()
         self.m_vbo.release()
-        self.m_shaderProgram.release()
+        self.m_programRGB.release()
+
+        # 检测框叠加层：每个顶点 [x, y, r, g, b]，x/y 是帧像素坐标
+        self.m_overlayProgram = QOpenGLShaderProgram(self)
+        self.m_overlayProgram.addShaderFromSourceCode(QOpenGLShader.Vertex, overlay_vertex_shader_src)
+        self.m_overlayProgram.addShaderFromSourceCode(QOpenGLShader.Fragment, overlay_fragment_shader_src)
+        self.m_overlayProgram.link()
+
+        self.m_overlayVao = QOpenGLVertexArrayObject(self)
+        self.m_overlayVao.create()
+        self.m_overlayVao.bind()
+
+        self.m_overlayVbo = QOpenGLBuffer(QOpenGLBuffer.VertexBuffer)
+        self.m_overlayVbo.setUsagePattern(QOpenGLBuffer.DynamicDraw)
+        self.m_overlayVbo.create()
+        self.m_overlayVbo.bind()
+
+        self.m_overlayProgram.bind()
+        self.m_overlayProgram.enableAttributeArray(0)
+        self.m_overlayProgram.enableAttributeArray(1)
+        self.m_overlayProgram.setAttributeBuffer(0, 0x1406, 0, 2, 5 * 4)
+        self.m_overlayProgram.setAttributeBuffer(1, 0x1406, 2 * 4, 3, 5 * 4)
+
+        self.m_overlayVao.release()
+        self.m_overlayVbo.release()
+        self.m_overlayProgram.release()
 
     def resizeGL(self, w: int, h: int):
         self.updateAspectRatio()
+        dpr = self.devicePixelRatioF()
+        self.signalResized.emit(round(w * dpr), round(h * dpr))
 
     def paintGL(self):
         f = self.context().functions()
@@ -225,34 +450,82 @@ class RenderWidget(QOpenGLWidget):
         f.glClearColor(0.0, 0.0, 0.0, 1.0)
         f.glClear(0x4000)  # GL_COLOR_BUFFER_BIT
 
+        if self.m_pending is not None and self.m_programRGB:
+            self.uploadPending()
+
         # 如果没有纹理，就直接返回，保持黑屏
-        if not self.m_shaderProgram or not self.m_textureY:
+        if not self.m_programRGB or not self.m_texture:
             return
 
         # 下面是原来的绘制逻辑
-        self.m_shaderProgram.bind()
+        program = self.m_programYUV if self.m_currentFormat == PixelFormat.YUV420P else self.m_programRGB
+        program.bind()
         self.m_vao.bind()
-        self.m_shaderProgram.setUniformValue("u_scale", self.m_scaleX, self.m_scaleY)
-        is_yuv = (self.m_currentFormat == PixelFormat.YUV420P)
-        self.m_shaderProgram.setUniformValue("isYUV", is_yuv)
-
-        self.m_textureY.bind(0)
-        self.m_shaderProgram.setUniformValue("textureY", 0)
-        if is_yuv:
-            self.m_textureU.bind(1)
-            self.m_shaderProgram.setUniformValue("textureU", 1)
-            self.m_textureV.bind(2)
-            self.m_shaderProgram.setUniformValue("textureV", 2)
+        program.setUniformValue("u_scale", self.m_scaleX, self.m_scaleY)
+
+        self.m_texture.bind(0)
 
         f.glDrawArrays(5, 0, 4)
 
-        if is_yuv:
-            self.m_textureV.release()
-            self.m_textureU.release()
-        self.m_textureY.release()
+        self.m_texture.release()
 
         self.m_vao.release()
-        self.m_shaderProgram.release()
+        program.release()
+
+        self.paintOverlay()
+
+    def paintOverlay(self):
+        if self.m_overlayDirty:
+            self.m_overlayDirty = False
+            vertices = self.m_overlayVertices
+            self.m_overlayVertexCount = 0 if vertices is None else len(vertices)
+            if self.m_overlayVertexCount:
+                self.m_overlayVbo.bind()
+                # 顶点数组是 setOverlay 新建的连续 float32，直接交给 allocate，不再拷成 bytes
+                self.m_overlayVbo.allocate(vertices, vertices.nbytes)
+                self.m_overlayVbo.release()
+
+        if self.m_overlayVertexCount:
+            f = self.context().functions()
+            self.m_overlayProgram.bind()
+            self.m_overlayVao.bind()
+            self.m_overlayProgram.setUniformValue("u_scale", self.m_scaleX, self.m_scaleY)
+            self.m_overlayProgram.setUniformValue("u_frameSize", float(self.m_width), float(self.m_height))
+            f.glDrawArrays(4, 0, self.m_overlayVertexCount)  # GL_TRIANGLES
+            self.m_overlayVao.release()
+            self.m_overlayProgram.release()
+
+        if self.m_overlayLabels:
+            self.paintOverlayLabels()
+
+    def paintOverlayLabels(self):
+        # 文字量很小，直接在 GL 画完之后用 QPainter 画，不自己做字形图集
+        imgW = self.width() * self.m_scaleX
+        imgH = self.height() * self.m_scaleY
+        offX = (self.width() - imgW) / 2
+        offY = (self.height() - imgH) / 2
+        sx = imgW / self.m_width
+        sy = imgH / self.m_height
+
+        painter = QPainter(self)
+        font = painter.font()
+        font.setPixelSize(14)
+        font.setBold(True)
+        painter.setFont(font)
+        fm = painter.fontMetrics()
+        black = QColor(0, 0, 0)
+        white = QColor(255, 255, 255)
+        for (x1, y1, _, y2), (text, color, objId) in zip(self.m_overlayBoxes, self.m_overlayLabels):
+            x = offX + x1 * sx
+            top = offY + y1 * sy
+            bottom = offY + y2 * sy
+            painter.fillRect(QRectF(x, top - fm.height() - 4, fm.horizontalAdvance(text), fm.height()), black)
+            painter.setPen(QColor(*color))
+            painter.drawText(QPointF(x, top - 4 - fm.descent()), text)
+            if objId is not None:
+                painter.setPen(white)
+                painter.drawText(QPointF(x, bottom + 4 + fm.ascent()), f"ID:{objId}")
+        painter.end()
 
 
 if __name__ == "__main__":
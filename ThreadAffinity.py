@@ -0,0 +1,76 @@
+# ThreadAffinity.py
+import ctypes
+import logging
+import os
+import sys
+from typing import Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 导入时记下进程原本允许的核，unpin 时恢复成它
+_DEFAULT_CPUS: Optional[Set[int]] = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+
+if sys.platform == "win32":
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _kernel32.GetCurrentThread.restype = ctypes.c_void_p
+    _kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+    _kernel32.SetThreadAffinityMask.argtypes = (ctypes.c_void_p, ctypes.c_size_t)
+    _kernel32.SetThreadAffinityMask.restype = ctypes.c_size_t
+    _kernel32.GetProcessAffinityMask.argtypes = (ctypes.c_void_p, ctypes.POINTER(ctypes.c_size_t),
+                                                 ctypes.POINTER(ctypes.c_size_t))
+    _kernel32.GetProcessAffinityMask.restype = ctypes.c_int
+else:
+    _kernel32 = None
+
+
+def _set_current_thread_mask(mask: int) -> bool:
+    if _kernel32 is not None:
+        return _kernel32.SetThreadAffinityMask(_kernel32.GetCurrentThread(), mask) != 0
+    if _DEFAULT_CPUS is not None:
+        # Linux 上 pid 0 指调用线程本身
+        os.sched_setaffinity(0, {i for i in range(mask.bit_length()) if mask >> i & 1})
+        return True
+    return False  # macOS 等平台没有公开的线程绑核接口
+
+
+def pin_current_thread(core: int) -> bool:
+    """
+    把调用线程绑到一个核上，让它反复读写的帧缓冲留在这个核的缓存里
+
+    :param core: 核编号，不在进程允许的核里时什么也不做
+    :return: 是否绑成功；不支持的平台返回 False
+    """
+    if _DEFAULT_CPUS is not None and core not in _DEFAULT_CPUS:
+        logger.info(f"核 {core} 不可用，跳过绑核")
+        return False
+    if core >= (os.cpu_count() or 1):
+        logger.info(f"核 {core} 不存在，跳过绑核")
+        return False
+    try:
+        ok = _set_current_thread_mask(1 << core)
+    except OSError as e:
+        logger.warning(f"绑核失败: {e}")
+        return False
+    if ok:
+        logger.info(f"线程已绑定到核 {core}")
+    return ok
+
+
+def unpin_current_thread() -> bool:
+    """
+    恢复调用线程的默认亲和性；绑过核的线程新建的线程会继承亲和性，用来放开它们
+    """
+    try:
+        if _kernel32 is not None:
+            process_mask = ctypes.c_size_t()
+            system_mask = ctypes.c_size_t()
+            if not _kernel32.GetProcessAffinityMask(_kernel32.GetCurrentProcess(), ctypes.byref(process_mask),
+                                                    ctypes.byref(system_mask)):
+                return False
+            return _set_current_thread_mask(process_mask.value)
+        if _DEFAULT_CPUS is not None:
+            os.sched_setaffinity(0, _DEFAULT_CPUS)
+            return True
+    except OSError as e:
+        logger.warning(f"恢复线程亲和性失败: {e}")
+    return False
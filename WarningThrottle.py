@@ -0,0 +1,28 @@
+# WarningThrottle.py
+import logging
+import time
+
+
+class WarningThrottle:
+    """
+    每个时间窗最多记一条警告，期间被略过的条数附在下一条后面；给每帧都会走的路径用，坏包风暴时不刷屏
+    """
+    __slots__ = ('logger', 'interval', 'last', 'suppressed')
+
+    def __init__(self, logger: logging.Logger, interval: float = 1.0):
+        self.logger = logger
+        self.interval = interval
+        self.last: float = 0.0
+        self.suppressed: int = 0
+
+    def warn(self, msg: str):
+        now = time.monotonic()
+        if now - self.last < self.interval:
+            self.suppressed += 1
+            return
+
+        if self.suppressed:
+            msg = f"{msg}（另有 {self.suppressed} 條已略過）"
+        self.last = now
+        self.suppressed = 0
+        self.logger.warning(msg)
@@ -1,12 +1,17 @@
 # ============ main.py ============
 import asyncio
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import qasync
 from PySide6.QtWidgets import QApplication
 from qt_material import apply_stylesheet
 
+from ConfigClient import get_config_client
 from MainWindow import MainWindow
+from ThreadAffinity import pin_current_thread, unpin_current_thread
+
+UI_CORE = 0  # Qt 主線程讀前台緩衝
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -16,10 +21,18 @@ if __name__ == "__main__":
     loop = qasync.QEventLoop(app)
     asyncio.set_event_loop(loop)
 
+    # 線程親和性統一在這裡定：主線程綁核後新建的線程會繼承親和性，
+    # 默認線程池（aiortc 編碼、to_thread）先放開再幹活；采集線程在 MainWindow.initCaptureThread 裡綁自己的核
+    pin_current_thread(UI_CORE)
+    loop.set_default_executor(ThreadPoolExecutor(thread_name_prefix="default", initializer=unpin_current_thread))
+
     # 現在就可以安全地使用 asyncio.create_task()、asyncio.sleep() 等
     window = MainWindow()  # 你的主視窗
     window.show()
 
     with loop:  # 推薦這樣寫，確保乾淨關閉
-        sys.exit(loop.run_forever())
+        loop.run_forever()
+        # 事件循環停了但還沒關，在這裡把共用的 httpx 連線池關掉；關掉的客戶端不能留在快取裡
+        loop.run_until_complete(get_config_client().close())
+        get_config_client.cache_clear()
     # sys.exit(app.exec())